@@ -1,16 +1,29 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Query
+from fastapi import Path as PathParam
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Annotated
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+import jwt
 import os
+import re
+import asyncio
 import logging
 import uuid
+import time
+import hashlib
 import aiofiles
+import filetype
+from cachetools import TTLCache
+from io import BytesIO
 from pathlib import Path
 from dotenv import load_dotenv
 from PIL import Image
@@ -23,26 +36,74 @@ load_dotenv(ROOT_DIR / '.env')
 # Configuration
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 ALGORITHM = "HS256"
+JWT_ALGORITHMS = [ALGORITHM]
+JWT_DECODE_OPTIONS = {"require": ["exp", "sub"]}
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+TOKEN_CACHE_TTL = 30  # Seconds a verified token is trusted without re-checking
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
+UPLOAD_CHUNK_SIZE = 1 << 20  # Stream uploads to disk 1MB at a time
+MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', 50 * 1024 * 1024))
+MAX_BATCH_UPLOAD_FILES = int(os.environ.get('MAX_BATCH_UPLOAD_FILES', 100))
+BATCH_UPLOAD_CONCURRENCY = 4  # Files of one batch streamed to disk at the same time
+THREAD_POOL_WORKERS = int(os.environ.get('THREAD_POOL_WORKERS', 32))
+CPU_POOL_WORKERS = int(os.environ.get('CPU_POOL_WORKERS', os.cpu_count() or 1))
+# Comma-separated list of browser origins allowed to call the API
+FRONTEND_ORIGINS = [
+    origin.strip()
+    for origin in os.environ.get('FRONTEND_ORIGIN', 'http://localhost:3000').split(',')
+    if origin.strip()
+]
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', 100)),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', 10)),
+    maxIdleTimeMS=30000,
+    serverSelectionTimeoutMS=2000,
+    # Fail fast with an error instead of queueing forever when the pool is exhausted
+    waitQueueTimeoutMS=int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000))
+)
 db = client[os.environ['DB_NAME']]
 
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# New hashes use argon2; existing bcrypt hashes still verify and are upgraded on login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__time_cost=2,
+    argon2__memory_cost=19456,
+    argon2__parallelism=1
+)
 security = HTTPBearer()
-
-app = FastAPI(title="YABOOK SaaS API", description="Yearbook Creation Platform API")
+# sha256(token) -> (exp, UserResponse); bounds JWT decode + user lookup to once per TTL
+token_cache = TTLCache(maxsize=10000, ttl=TOKEN_CACHE_TTL)
+# key -> task already computing it; concurrent callers await the same task
+inflight: Dict[Any, asyncio.Task] = {}
+# Password hashing and image decoding are CPU-bound; keep them off the I/O pool
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_POOL_WORKERS, thread_name_prefix="cpu")
+
+# List handlers return ORJSONResponse directly, which bypasses response_model
+# validation entirely; there response_model only documents the OpenAPI schema,
+# so those handlers must project documents to the response shape themselves
+app = FastAPI(
+    title="YABOOK SaaS API",
+    description="Yearbook Creation Platform API",
+    default_response_class=ORJSONResponse
+)
 api_router = APIRouter(prefix="/api")
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Ids are uuid4 strings; reject anything else with 422 before touching MongoDB
+UUID_PATTERN = r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+ProjectId = Annotated[str, PathParam(pattern=UUID_PATTERN)]
+PhotoId = Annotated[str, PathParam(pattern=UUID_PATTERN)]
+
 # Pydantic Models
 class UserBase(BaseModel):
     email: EmailStr
@@ -83,6 +144,10 @@ class ProjectResponse(ProjectBase):
     updated_at: datetime
     status: str = "active"  # active, archived, published
 
+class ProjectListResponse(BaseModel):
+    items: List[ProjectResponse]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for keyset pagination
+
 class PhotoMetadata(BaseModel):
     width: Optional[int] = None
     height: Optional[int] = None
@@ -122,12 +187,29 @@ class PhotoResponse(PhotoBase):
     uploaded_at: datetime
     updated_at: datetime
 
+class PhotoListItem(BaseModel):
+    """Slim photo shape for gallery listings; the detail endpoint returns PhotoResponse"""
+    id: str
+    original_name: str
+    project_id: str
+    tags: List[str] = []
+    consent_status: str = "pending"
+    description: Optional[str] = None
+    taken_date: Optional[datetime] = None
+    location: Optional[str] = None
+    people: List[str] = []
+    file_size: int
+    mime_type: str
+    metadata: Optional[PhotoMetadata] = None
+    uploaded_at: datetime
+
 class PhotoSearchResponse(BaseModel):
-    photos: List[PhotoResponse]
+    photos: List[PhotoListItem]
     total: int
     page: int
     per_page: int
     total_pages: int
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for keyset pagination
 
 class BulkPhotoOperation(BaseModel):
     photo_ids: List[str]
@@ -141,9 +223,37 @@ class PhotoStats(BaseModel):
     total_size: int
     recent_uploads: int  # Last 7 days
 
+# Query projections - only ship the fields the response models actually use
+USER_PROJECTION = {"_id": 0, "hashed_password": 0}
+LOGIN_PROJECTION = {"_id": 0, "id": 1, "hashed_password": 1}
+PROJECT_PROJECTION = {"_id": 0}
+PROJECT_OWNER_PROJECTION = {"_id": 0, "owner_id": 1}
+PROJECT_ACCESS_PROJECTION = {"_id": 0, "owner_id": 1, "collaborators": 1}
+PHOTO_PROJECTION = {"_id": 0}
+PHOTO_FILE_PROJECTION = {"_id": 0, "file_path": 1}
+PHOTO_LIST_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "original_name": 1,
+    "project_id": 1,
+    "tags": 1,
+    "consent_status": 1,
+    "description": 1,
+    "taken_date": 1,
+    "location": 1,
+    "people": 1,
+    "file_size": 1,
+    "mime_type": 1,
+    "metadata.width": 1,
+    "metadata.height": 1,
+    "metadata.format": 1,
+    "uploaded_at": 1
+}
+
 # Utility functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def verify_and_update_password(plain_password, hashed_password):
+    """Return (verified, new_hash); new_hash is set when the stored hash is deprecated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
@@ -158,53 +268,267 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def single_flight(key, factory):
+    """Run factory() once for all concurrent callers sharing key"""
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        inflight[key] = task
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+    # Shield so one cancelled caller does not cancel the work for the others
+    return await asyncio.shield(task)
+
+async def authenticate_token(token: str, cache_key: bytes) -> UserResponse:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        payload = jwt.decode(
+            token,
+            SECRET_KEY,
+            algorithms=JWT_ALGORITHMS,
+            options=JWT_DECODE_OPTIONS
+        )
+        user_id: str = payload["sub"]
+    except jwt.InvalidTokenError:
         raise credentials_exception
     
-    user = await db.users.find_one({"id": user_id})
+    user = await db.users.find_one({"id": user_id}, USER_PROJECTION)
     if user is None:
         raise credentials_exception
-    return UserResponse(**user)
+    
+    current_user = UserResponse(**user)
+    token_cache[cache_key] = (payload["exp"], current_user)
+    return current_user
 
-def extract_image_metadata(file_path: Path) -> Optional[PhotoMetadata]:
-    """Extract metadata from image file"""
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    cache_key = hashlib.sha256(credentials.credentials.encode()).digest()
+    cached = token_cache.get(cache_key)
+    if cached is not None and cached[0] > time.time():
+        return cached[1]
+    
+    # A burst of requests with the same uncached token shares one decode + lookup
+    return await single_flight(
+        ("auth", cache_key),
+        lambda: authenticate_token(credentials.credentials, cache_key)
+    )
+
+def has_project_access(project: dict, user: UserResponse) -> bool:
+    """Owners and collaborators may access a project"""
+    return project["owner_id"] == user.id or user.id in project["collaborators"]
+
+async def get_accessible_project(
+    project_id: ProjectId,
+    current_user: UserResponse = Depends(get_current_user)
+) -> dict:
+    """Resolve a project the current user has access to, or fail with 404/403"""
+    project = await db.projects.find_one({"id": project_id}, PROJECT_PROJECTION)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    if not has_project_access(project, current_user):
+        raise HTTPException(status_code=403, detail="Access denied")
+    return project
+
+async def get_accessible_photo(
+    photo_id: PhotoId,
+    current_user: UserResponse = Depends(get_current_user)
+) -> dict:
+    """Resolve a photo and its project in a single query, or fail with 404/403"""
+    pipeline = [
+        {"$match": {"id": photo_id}},
+        {"$limit": 1},
+        {"$project": PHOTO_PROJECTION},
+        # Join only the fields the access check reads, not the whole project
+        {"$lookup": {
+            "from": "projects",
+            "let": {"project_id": "$project_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$id", "$$project_id"]}}},
+                {"$limit": 1},
+                {"$project": PROJECT_ACCESS_PROJECTION}
+            ],
+            "as": "project"
+        }}
+    ]
+    results = await db.photos.aggregate(pipeline).to_list(1)
+    if not results:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    
+    photo = results[0]
+    projects = photo.pop("project")
+    if not projects:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    if not has_project_access(projects[0], current_user):
+        raise HTTPException(status_code=403, detail="Access denied")
+    return photo
+
+def read_image_metadata(source) -> dict:
+    # Image.open only parses the header; pixel data is never decoded here.
+    # Returns the stored PhotoMetadata shape directly - PIL values need no validation
+    with Image.open(source) as img:
+        return {
+            "width": img.width,
+            "height": img.height,
+            "format": img.format,
+            "mode": img.mode,
+            "has_transparency": img.mode in ('RGBA', 'LA') or 'transparency' in img.info
+        }
+
+def extract_image_metadata(file_path: Path, head: bytes = b"") -> Optional[dict]:
+    """Extract metadata from the upload's leading bytes, re-reading the file only if needed"""
+    if head:
+        try:
+            return read_image_metadata(BytesIO(head))
+        except Exception:
+            pass  # Header runs past the first chunk; fall back to the file on disk
     try:
-        with Image.open(file_path) as img:
-            return PhotoMetadata(
-                width=img.width,
-                height=img.height,
-                format=img.format,
-                mode=img.mode,
-                has_transparency=img.mode in ('RGBA', 'LA') or 'transparency' in img.info
-            )
+        return read_image_metadata(file_path)
     except Exception as e:
         logger.warning(f"Could not extract metadata from {file_path}: {e}")
         return None
 
+def encode_cursor(timestamp: datetime, item_id: str) -> str:
+    return f"{timestamp.isoformat()}|{item_id}"
+
+def decode_cursor(cursor: str):
+    timestamp, _, item_id = cursor.partition("|")
+    try:
+        if not item_id:
+            raise ValueError(cursor)
+        return datetime.fromisoformat(timestamp), item_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def safe_unlink(file_path: Path) -> None:
+    """Remove a stored upload, tolerating files that are already gone"""
+    try:
+        file_path.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"Could not delete {file_path}: {e}")
+
+async def store_photo_upload(project_id: str, file: UploadFile, owner_id: str) -> dict:
+    """Validate and stream an upload to disk, returning its photo record"""
+    # Validate file type
+    if not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    # The client-sent content type is spoofable; sniff the real type from the magic bytes
+    head = await file.read(UPLOAD_CHUNK_SIZE)
+    kind = filetype.guess(head)
+    if kind is None or not kind.mime.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    # Generate unique filename from the detected type, not the client filename
+    unique_filename = f"{uuid.uuid4()}.{kind.extension}"
+    file_path = UPLOAD_DIR / project_id / unique_filename
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    # Stream file to disk so memory stays bounded regardless of upload size
+    file_size = len(head)
+    try:
+        async with aiofiles.open(file_path, 'wb') as f:
+            await f.write(head)
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > MAX_UPLOAD_SIZE:
+                    break
+                await f.write(chunk)
+    except BaseException:
+        # A disconnect or I/O error mid-stream must not leave a truncated file behind
+        safe_unlink(file_path)
+        raise
+    
+    loop = asyncio.get_running_loop()
+    if file_size > MAX_UPLOAD_SIZE:
+        await loop.run_in_executor(None, safe_unlink, file_path)
+        raise HTTPException(status_code=413, detail="File too large")
+    
+    # Extract image metadata from the first chunk we already hold in memory
+    metadata = await loop.run_in_executor(cpu_executor, extract_image_metadata, file_path, head)
+    
+    # Photo record for the database
+    now = datetime.utcnow()
+    return {
+        "id": str(uuid.uuid4()),
+        "filename": unique_filename,
+        "original_name": file.filename,
+        "project_id": project_id,
+        "owner_id": owner_id,
+        "file_path": str(file_path),
+        "file_size": file_size,
+        "mime_type": kind.mime,
+        "metadata": metadata,
+        "tags": [],
+        "consent_status": "pending",
+        "description": None,
+        "taken_date": None,
+        "location": None,
+        "people": [],
+        "uploaded_at": now,
+        "updated_at": now
+    }
+
+async def discard_uploads(photos: List[dict]) -> None:
+    """Delete the stored files of uploads that will not keep a database row"""
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(
+        loop.run_in_executor(None, safe_unlink, Path(photo["file_path"]))
+        for photo in photos
+    ))
+
+def photo_response(photo: dict) -> PhotoResponse:
+    """Build a PhotoResponse from a stored record; response_model still validates it on the way out"""
+    metadata = photo.get("metadata")
+    return PhotoResponse.model_construct(**{
+        **photo,
+        "metadata": PhotoMetadata.model_construct(**metadata) if metadata else None
+    })
+
+async def compute_photo_stats(project_id: str) -> PhotoStats:
+    """Aggregate a project's photo counts, breakdowns and total size"""
+    # Recent uploads (last 7 days)
+    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    
+    # Compute every breakdown in one pass over the project's photos
+    pipeline = [
+        {"$match": {"project_id": project_id}},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "by_consent": [{"$group": {"_id": "$consent_status", "count": {"$sum": 1}}}],
+            "by_type": [{"$group": {"_id": "$mime_type", "count": {"$sum": 1}}}],
+            "size": [{"$group": {"_id": None, "total_size": {"$sum": "$file_size"}}}],
+            "recent": [
+                {"$match": {"uploaded_at": {"$gte": seven_days_ago}}},
+                {"$count": "count"}
+            ]
+        }}
+    ]
+    facets = (await db.photos.aggregate(pipeline).to_list(1))[0]
+    
+    total_photos = facets["total"][0]["count"] if facets["total"] else 0
+    consent_stats = {result["_id"]: result["count"] for result in facets["by_consent"]}
+    type_stats = {result["_id"]: result["count"] for result in facets["by_type"]}
+    total_size = facets["size"][0]["total_size"] if facets["size"] else 0
+    recent_uploads = facets["recent"][0]["count"] if facets["recent"] else 0
+    
+    return PhotoStats(
+        total_photos=total_photos,
+        by_consent_status=consent_stats,
+        by_file_type=type_stats,
+        total_size=total_size,
+        recent_uploads=recent_uploads
+    )
+
 # Authentication Endpoints
 @api_router.post("/auth/register", response_model=UserResponse)
 async def register_user(user: UserCreate):
-    # Check if user already exists
-    existing_user = await db.users.find_one({"email": user.email})
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Create new user
-    hashed_password = get_password_hash(user.password)
+    # Create new user - the unique email index rejects duplicates in the same round-trip
+    loop = asyncio.get_running_loop()
+    hashed_password = await loop.run_in_executor(cpu_executor, get_password_hash, user.password)
     user_dict = {
         "id": str(uuid.uuid4()),
         "email": user.email,
@@ -215,19 +539,35 @@ async def register_user(user: UserCreate):
         "is_active": True
     }
     
-    await db.users.insert_one(user_dict)
-    return UserResponse(**user_dict)
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+    return UserResponse.model_construct(**user_dict)
 
 @api_router.post("/auth/login", response_model=Token)
 async def login_user(user: UserLogin):
-    db_user = await db.users.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["hashed_password"]):
+    db_user = await db.users.find_one({"email": user.email}, LOGIN_PROJECTION)
+    verified, new_hash = False, None
+    if db_user:
+        loop = asyncio.get_running_loop()
+        verified, new_hash = await loop.run_in_executor(
+            cpu_executor, verify_and_update_password, user.password, db_user["hashed_password"]
+        )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Rehash legacy bcrypt passwords with argon2 now that we have the plaintext
+    if new_hash:
+        await db.users.update_one({"id": db_user["id"]}, {"$set": {"hashed_password": new_hash}})
+    
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": db_user["id"]}, expires_delta=access_token_expires
@@ -244,6 +584,7 @@ async def create_project(
     project: ProjectCreate,
     current_user: UserResponse = Depends(get_current_user)
 ):
+    now = datetime.utcnow()
     project_dict = {
         "id": str(uuid.uuid4()),
         "title": project.title,
@@ -253,47 +594,58 @@ async def create_project(
         "theme_color": project.theme_color,
         "owner_id": current_user.id,
         "collaborators": [],
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow(),
+        "created_at": now,
+        "updated_at": now,
         "status": "active"
     }
     
     await db.projects.insert_one(project_dict)
-    return ProjectResponse(**project_dict)
+    return ProjectResponse.model_construct(**project_dict)
 
-@api_router.get("/projects", response_model=List[ProjectResponse])
-async def get_user_projects(current_user: UserResponse = Depends(get_current_user)):
-    projects = await db.projects.find({
+@api_router.get("/projects", response_model=ProjectListResponse)
+async def get_user_projects(
+    current_user: UserResponse = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=200, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    query = {
         "$or": [
             {"owner_id": current_user.id},
             {"collaborators": current_user.id}
         ]
-    }).to_list(100)
-    
-    return [ProjectResponse(**project) for project in projects]
+    }
+    if cursor:
+        # Seek on (created_at, id) so projects created in the same instant
+        # are neither repeated nor skipped across pages
+        last_created_at, last_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": last_created_at}},
+            {"created_at": last_created_at, "id": {"$lt": last_id}}
+        ]}]}
+    
+    projects = await db.projects.find(query, PROJECT_PROJECTION).sort(
+        [("created_at", -1), ("id", -1)]
+    ).limit(limit).to_list(limit)
+    next_cursor = None
+    if len(projects) == limit:
+        next_cursor = encode_cursor(projects[-1]["created_at"], projects[-1]["id"])
+    
+    return ORJSONResponse({"items": projects, "next_cursor": next_cursor})
 
 @api_router.get("/projects/{project_id}", response_model=ProjectResponse)
 async def get_project(
-    project_id: str,
-    current_user: UserResponse = Depends(get_current_user)
+    project_id: ProjectId,
+    project: dict = Depends(get_accessible_project)
 ):
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Check if user has access to this project
-    if project["owner_id"] != current_user.id and current_user.id not in project["collaborators"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    return ProjectResponse(**project)
+    return ProjectResponse.model_construct(**project)
 
 @api_router.put("/projects/{project_id}", response_model=ProjectResponse)
 async def update_project(
-    project_id: str,
+    project_id: ProjectId,
     project_update: ProjectCreate,
     current_user: UserResponse = Depends(get_current_user)
 ):
-    project = await db.projects.find_one({"id": project_id})
+    project = await db.projects.find_one({"id": project_id}, PROJECT_OWNER_PROJECTION)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
@@ -301,103 +653,93 @@ async def update_project(
     if project["owner_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Only project owner can update")
     
-    update_dict = project_update.dict()
+    update_dict = project_update.model_dump()
     update_dict["updated_at"] = datetime.utcnow()
     
-    await db.projects.update_one({"id": project_id}, {"$set": update_dict})
-    updated_project = await db.projects.find_one({"id": project_id})
-    return ProjectResponse(**updated_project)
+    updated_project = await db.projects.find_one_and_update(
+        {"id": project_id},
+        {"$set": update_dict},
+        projection=PROJECT_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    return ProjectResponse.model_construct(**updated_project)
 
 # Enhanced Photo Management Endpoints
 @api_router.post("/projects/{project_id}/photos", response_model=PhotoResponse)
 async def upload_photo(
-    project_id: str,
+    project_id: ProjectId,
     file: UploadFile = File(...),
+    project: dict = Depends(get_accessible_project),
     current_user: UserResponse = Depends(get_current_user)
 ):
-    # Verify project access
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    if project["owner_id"] != current_user.id and current_user.id not in project["collaborators"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    # Validate file type
-    if not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="File must be an image")
+    photo_dict = await store_photo_upload(project_id, file, current_user.id)
+    await db.photos.insert_one(photo_dict)
+    return photo_response(photo_dict)
+
+@api_router.post("/projects/{project_id}/photos/batch", response_model=List[PhotoResponse])
+async def upload_photos_batch(
+    project_id: ProjectId,
+    files: List[UploadFile] = File(...),
+    project: dict = Depends(get_accessible_project),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    if len(files) > MAX_BATCH_UPLOAD_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_UPLOAD_FILES} files per batch")
     
-    # Generate unique filename
-    file_extension = file.filename.split('.')[-1]
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = UPLOAD_DIR / project_id / unique_filename
-    file_path.parent.mkdir(parents=True, exist_ok=True)
+    # Stream files to disk concurrently, a few at a time to bound open files and buffers
+    semaphore = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
     
-    # Save file
-    content = await file.read()
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(content)
+    async def store(file: UploadFile) -> dict:
+        async with semaphore:
+            return await store_photo_upload(project_id, file, current_user.id)
     
-    # Extract image metadata
-    metadata = extract_image_metadata(file_path)
+    results = await asyncio.gather(*(store(file) for file in files), return_exceptions=True)
+    photos = [result for result in results if not isinstance(result, BaseException)]
     
-    # Save photo metadata to database
-    photo_dict = {
-        "id": str(uuid.uuid4()),
-        "filename": unique_filename,
-        "original_name": file.filename,
-        "project_id": project_id,
-        "owner_id": current_user.id,
-        "file_path": str(file_path),
-        "file_size": len(content),
-        "mime_type": file.content_type,
-        "metadata": metadata.dict() if metadata else None,
-        "tags": [],
-        "consent_status": "pending",
-        "description": None,
-        "taken_date": None,
-        "location": None,
-        "people": [],
-        "uploaded_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
-    }
+    # The batch is all-or-nothing: a rejected file has already removed its own
+    # partial upload, so drop whatever the other files stored
+    failure = next((result for result in results if isinstance(result, BaseException)), None)
+    if failure is not None:
+        await discard_uploads(photos)
+        raise failure
     
-    await db.photos.insert_one(photo_dict)
-    return PhotoResponse(**photo_dict)
+    # One round-trip for the whole batch; unordered lets the server apply inserts in parallel
+    try:
+        await db.photos.insert_many(photos, ordered=False)
+    except Exception:
+        # An unordered insert may have written some rows before failing
+        await db.photos.delete_many({"id": {"$in": [photo["id"] for photo in photos]}})
+        await discard_uploads(photos)
+        raise
+    return [photo_response(photo) for photo in photos]
 
 @api_router.get("/projects/{project_id}/photos", response_model=PhotoSearchResponse)
 async def get_project_photos(
-    project_id: str,
-    current_user: UserResponse = Depends(get_current_user),
+    project_id: ProjectId,
+    project: dict = Depends(get_accessible_project),
     search: Optional[str] = Query(None, description="Search in filename, tags, description"),
     tags: Optional[str] = Query(None, description="Comma-separated tags to filter by"),
     consent_status: Optional[str] = Query(None, description="Filter by consent status"),
     date_from: Optional[datetime] = Query(None, description="Filter photos from this date"),
     date_to: Optional[datetime] = Query(None, description="Filter photos until this date"),
-    sort_by: str = Query("uploaded_at", description="Sort by field"),
+    sort_by: str = Query("uploaded_at", description="Sort by field, or 'relevance' when searching"),
     sort_order: str = Query("desc", description="Sort order: asc or desc"),
     page: int = Query(1, ge=1, description="Page number"),
-    per_page: int = Query(20, ge=1, le=100, description="Items per page")
+    per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; replaces page")
 ):
-    # Verify project access
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    if project["owner_id"] != current_user.id and current_user.id not in project["collaborators"]:
-        raise HTTPException(status_code=403, detail="Access denied")
+    if cursor and sort_by != "uploaded_at":
+        raise HTTPException(status_code=400, detail="Cursor pagination requires sort_by=uploaded_at")
     
     # Build search query
     query = {"project_id": project_id}
     
-    # Text search
+    # Text search (backed by the photos text index), with an anchored prefix
+    # match on the filename so partially typed names still find results
     if search:
         query["$or"] = [
-            {"original_name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-            {"tags": {"$regex": search, "$options": "i"}},
-            {"location": {"$regex": search, "$options": "i"}},
-            {"people": {"$regex": search, "$options": "i"}}
+            {"$text": {"$search": search}},
+            {"original_name": {"$regex": f"^{re.escape(search)}", "$options": "i"}}
         ]
     
     # Tag filter
@@ -418,161 +760,107 @@ async def get_project_photos(
             date_filter["$lte"] = date_to
         query["uploaded_at"] = date_filter
     
-    # Sort configuration
+    # Sort configuration; "id" breaks ties so pages are stable
     sort_direction = 1 if sort_order == "asc" else -1
-    sort_config = [(sort_by, sort_direction)]
-    
-    # Calculate pagination
-    skip = (page - 1) * per_page
+    if sort_by == "relevance" and search:
+        sort_config = {"score": {"$meta": "textScore"}, "id": -1}
+    else:
+        sort_config = {sort_by: sort_direction, "id": sort_direction}
+    
+    sort_spec = list(sort_config.items())
+    if cursor:
+        # Keyset pagination: seek straight past the previous page's last photo
+        # on the (project_id, uploaded_at, id) index instead of skipping
+        last_uploaded_at, last_id = decode_cursor(cursor)
+        seek = "$gt" if sort_direction == 1 else "$lt"
+        page_query = {"$and": [query, {"$or": [
+            {"uploaded_at": {seek: last_uploaded_at}},
+            {"uploaded_at": last_uploaded_at, "id": {seek: last_id}}
+        ]}]}
+        photos, total = await asyncio.gather(
+            db.photos.find(page_query, PHOTO_LIST_PROJECTION).sort(sort_spec).limit(per_page).to_list(per_page),
+            db.photos.count_documents(query)
+        )
+    else:
+        # Count with count_documents alongside the page query; a $facet $count
+        # would pull every matched document through the pipeline just to count it
+        skip = (page - 1) * per_page
+        photos, total = await asyncio.gather(
+            db.photos.find(query, PHOTO_LIST_PROJECTION).sort(sort_spec).skip(skip).limit(per_page).to_list(per_page),
+            db.photos.count_documents(query)
+        )
     
-    # Execute queries
-    photos_cursor = db.photos.find(query).sort(sort_config).skip(skip).limit(per_page)
-    photos = await photos_cursor.to_list(per_page)
-    total = await db.photos.count_documents(query)
+    next_cursor = None
+    if sort_by == "uploaded_at" and len(photos) == per_page:
+        next_cursor = encode_cursor(photos[-1]["uploaded_at"], photos[-1]["id"])
     
     total_pages = (total + per_page - 1) // per_page
     
-    return PhotoSearchResponse(
-        photos=[PhotoResponse(**photo) for photo in photos],
-        total=total,
-        page=page,
-        per_page=per_page,
-        total_pages=total_pages
-    )
+    return ORJSONResponse({
+        "photos": photos,
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": total_pages,
+        "next_cursor": next_cursor
+    })
 
 @api_router.get("/projects/{project_id}/photos/stats", response_model=PhotoStats)
 async def get_photo_stats(
-    project_id: str,
-    current_user: UserResponse = Depends(get_current_user)
+    project_id: ProjectId,
+    project: dict = Depends(get_accessible_project)
 ):
-    # Verify project access
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    if project["owner_id"] != current_user.id and current_user.id not in project["collaborators"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    # Get stats
-    total_photos = await db.photos.count_documents({"project_id": project_id})
-    
-    # Consent status breakdown
-    consent_pipeline = [
-        {"$match": {"project_id": project_id}},
-        {"$group": {"_id": "$consent_status", "count": {"$sum": 1}}}
-    ]
-    consent_stats = {}
-    async for result in db.photos.aggregate(consent_pipeline):
-        consent_stats[result["_id"]] = result["count"]
-    
-    # File type breakdown
-    type_pipeline = [
-        {"$match": {"project_id": project_id}},
-        {"$group": {"_id": "$mime_type", "count": {"$sum": 1}}}
-    ]
-    type_stats = {}
-    async for result in db.photos.aggregate(type_pipeline):
-        type_stats[result["_id"]] = result["count"]
-    
-    # Total size
-    size_pipeline = [
-        {"$match": {"project_id": project_id}},
-        {"$group": {"_id": None, "total_size": {"$sum": "$file_size"}}}
-    ]
-    total_size = 0
-    async for result in db.photos.aggregate(size_pipeline):
-        total_size = result["total_size"]
-    
-    # Recent uploads (last 7 days)
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    recent_uploads = await db.photos.count_documents({
-        "project_id": project_id,
-        "uploaded_at": {"$gte": seven_days_ago}
-    })
-    
-    return PhotoStats(
-        total_photos=total_photos,
-        by_consent_status=consent_stats,
-        by_file_type=type_stats,
-        total_size=total_size,
-        recent_uploads=recent_uploads
-    )
+    # Dashboards poll this; concurrent requests for one project share a single aggregation
+    return await single_flight(("photo_stats", project_id), lambda: compute_photo_stats(project_id))
 
 @api_router.get("/photos/{photo_id}", response_model=PhotoResponse)
 async def get_photo(
-    photo_id: str,
-    current_user: UserResponse = Depends(get_current_user)
+    photo_id: PhotoId,
+    photo: dict = Depends(get_accessible_photo)
 ):
-    photo = await db.photos.find_one({"id": photo_id})
-    if not photo:
-        raise HTTPException(status_code=404, detail="Photo not found")
-    
-    # Verify project access
-    project = await db.projects.find_one({"id": photo["project_id"]})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    if project["owner_id"] != current_user.id and current_user.id not in project["collaborators"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    return PhotoResponse(**photo)
+    return photo_response(photo)
 
 @api_router.put("/photos/{photo_id}", response_model=PhotoResponse)
 async def update_photo(
-    photo_id: str,
+    photo_id: PhotoId,
     photo_update: PhotoUpdate,
-    current_user: UserResponse = Depends(get_current_user)
+    photo: dict = Depends(get_accessible_photo)
 ):
-    photo = await db.photos.find_one({"id": photo_id})
-    if not photo:
-        raise HTTPException(status_code=404, detail="Photo not found")
-    
-    # Verify project access
-    project = await db.projects.find_one({"id": photo["project_id"]})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    if project["owner_id"] != current_user.id and current_user.id not in project["collaborators"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
     # Update photo
-    update_dict = photo_update.dict(exclude_unset=True)
+    update_dict = photo_update.model_dump(exclude_unset=True)
     update_dict["updated_at"] = datetime.utcnow()
     
-    await db.photos.update_one({"id": photo_id}, {"$set": update_dict})
-    updated_photo = await db.photos.find_one({"id": photo_id})
-    return PhotoResponse(**updated_photo)
+    updated_photo = await db.photos.find_one_and_update(
+        {"id": photo_id},
+        {"$set": update_dict},
+        projection=PHOTO_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    return photo_response(updated_photo)
 
 @api_router.post("/projects/{project_id}/photos/bulk")
 async def bulk_photo_operation(
-    project_id: str,
+    project_id: ProjectId,
     operation: BulkPhotoOperation,
-    current_user: UserResponse = Depends(get_current_user)
+    project: dict = Depends(get_accessible_project)
 ):
-    # Verify project access
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    if project["owner_id"] != current_user.id and current_user.id not in project["collaborators"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
     # Verify all photos belong to this project
     photos = await db.photos.find({
         "id": {"$in": operation.photo_ids},
         "project_id": project_id
-    }).to_list(len(operation.photo_ids))
+    }, PHOTO_FILE_PROJECTION).to_list(len(operation.photo_ids))
     
     if len(photos) != len(operation.photo_ids):
         raise HTTPException(status_code=400, detail="Some photos not found or don't belong to this project")
     
     # Execute operation
     if operation.operation == "delete":
-        # Delete files from disk
-        for photo in photos:
-            file_path = Path(photo["file_path"])
-            if file_path.exists():
-                file_path.unlink()
+        # Delete files from disk in parallel, off the event loop
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(None, safe_unlink, Path(photo["file_path"]))
+            for photo in photos
+        ])
         
         # Delete from database
         result = await db.photos.delete_many({"id": {"$in": operation.photo_ids}})
@@ -611,25 +899,12 @@ async def bulk_photo_operation(
 
 @api_router.delete("/photos/{photo_id}")
 async def delete_photo(
-    photo_id: str,
-    current_user: UserResponse = Depends(get_current_user)
+    photo_id: PhotoId,
+    photo: dict = Depends(get_accessible_photo)
 ):
-    photo = await db.photos.find_one({"id": photo_id})
-    if not photo:
-        raise HTTPException(status_code=404, detail="Photo not found")
-    
-    # Verify project access
-    project = await db.projects.find_one({"id": photo["project_id"]})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    if project["owner_id"] != current_user.id and current_user.id not in project["collaborators"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
     # Delete file from disk
-    file_path = Path(photo["file_path"])
-    if file_path.exists():
-        file_path.unlink()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, safe_unlink, Path(photo["file_path"]))
     
     # Delete from database
     await db.photos.delete_one({"id": photo_id})
@@ -643,18 +918,96 @@ async def health_check():
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=FRONTEND_ORIGINS,
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,  # Let browsers cache preflight responses for 24h
 )
 
+@app.on_event("startup")
+async def configure_executor():
+    # Blocking file I/O runs here; CPU-bound work goes to cpu_executor
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS)
+    )
+
+@app.on_event("startup")
+async def warm_db_client():
+    # Open pooled connections and load collection metadata before the first
+    # request has to pay for them
+    await db.command("ping")
+    await db.photos.estimated_document_count()
+    pool_options = client.delegate.options.pool_options
+    logger.info(
+        f"MongoDB pool ready: min={pool_options.min_pool_size} "
+        f"max={pool_options.max_pool_size} wait_queue_timeout={pool_options.wait_queue_timeout}s"
+    )
+
+@app.on_event("startup")
+async def create_indexes():
+    # Every lookup in this API goes through the application-level "id" field,
+    # so back it with a unique index rather than relying on Mongo's ObjectId _id.
+    await db.users.create_indexes([IndexModel("id", unique=True)])
+    # Older deployments may hold duplicate emails from the previous racy
+    # check-then-insert; keep serving and report them instead of failing startup
+    try:
+        await db.users.create_indexes([IndexModel("email", unique=True)])
+    except OperationFailure as e:
+        duplicates = await db.users.aggregate([
+            {"$group": {"_id": "$email", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}}
+        ]).to_list(None)
+        logger.error(
+            f"Unique email index not built ({e}); duplicate emails: "
+            f"{[duplicate['_id'] for duplicate in duplicates]}"
+        )
+    await db.projects.create_indexes([
+        IndexModel("id", unique=True),
+        # Newest-first, cursor-paginated project listings for owners and collaborators
+        IndexModel([("owner_id", 1), ("created_at", -1), ("id", -1)]),
+        IndexModel([("collaborators", 1), ("created_at", -1), ("id", -1)])
+    ])
+    await db.photos.create_indexes([
+        IndexModel("id", unique=True),
+        # Paginated listing (filter by project, newest first) and recent-upload counts
+        IndexModel([("project_id", 1), ("uploaded_at", -1), ("id", -1)]),
+        # Stats grouping and consent filtering
+        IndexModel([("project_id", 1), ("consent_status", 1)]),
+        IndexModel([("project_id", 1), ("mime_type", 1)]),
+        IndexModel([
+            ("original_name", "text"),
+            ("description", "text"),
+            ("tags", "text"),
+            ("location", "text"),
+            ("people", "text")
+        ], name="photo_text_idx"),
+        # Every $or clause alongside $text must be indexed
+        IndexModel("original_name")
+    ])
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
 
+@app.on_event("shutdown")
+async def shutdown_cpu_executor():
+    cpu_executor.shutdown(wait=False)
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    uvicorn.run(
+        "server:app",
+        app_dir=str(ROOT_DIR),
+        host="0.0.0.0",
+        port=8001,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)),
+        limit_concurrency=int(os.environ.get('UVICORN_LIMIT_CONCURRENCY', 1000)),
+        backlog=2048
+    )
\ No newline at end of file
@@ -1,143 +1,258 @@
-import requests
+import httpx
+import orjson
+import asyncio
 import unittest
 import uuid
 import os
+import sys
+import logging
+import logging.handlers
+import functools
+import itertools
+import time
 from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from dotenv import dotenv_values
 
+# HTTP/2 lets every test, including the concurrent probes, share one multiplexed connection
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=8, max_connections=16, keepalive_expiry=30.0)
+PROBE_CONCURRENCY = 10
+# The preview host sits behind a proxy that briefly answers 502-504 during restarts
+RETRY_STATUSES = {502, 503, 504}
+RETRY_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+FRONTEND_ENV = Path(__file__).parent / "frontend" / ".env"
+DEFAULT_BACKEND_URL = "https://f436a160-5c20-47d4-aacc-9fa4264abd61.preview.emergentagent.com"
+
+@functools.lru_cache(maxsize=1)
+def backend_url():
+    """Resolve the API base URL once, preferring the environment over the frontend .env file"""
+    url = (
+        os.environ.get("REACT_APP_BACKEND_URL")
+        or dotenv_values(FRONTEND_ENV).get("REACT_APP_BACKEND_URL")
+        or DEFAULT_BACKEND_URL
+    )
+    return f"{url.rstrip('/')}/api"
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Route templates, relative to the client's base_url
+HEALTH_PATH = "/health"
+REGISTER_PATH = "/auth/register"
+LOGIN_PATH = "/auth/login"
+ME_PATH = "/auth/me"
+PROJECTS_PATH = "/projects"
+PROJECT_PATH = "/projects/{pid}"
+PHOTOS_PATH = "/projects/{pid}/photos"
+PHOTO_BATCH_PATH = "/projects/{pid}/photos/batch"
+PHOTO_STATS_PATH = "/projects/{pid}/photos/stats"
+THEME_COLOR_DEFAULT = "#E50914"
+# Static part of the test user; only the email is generated per class
+TEST_USER_DEFAULTS = {
+    "password": "Test123!",
+    "full_name": "Test User",
+    "role": "user"
+}
+PROJECT_DATA = {
+    "title": "Test Yearbook Project",
+    "description": "A test project for API testing",
+    "school_name": "Test School",
+    "academic_year": "2024-2025",
+    "theme_color": THEME_COLOR_DEFAULT
+}
+
+# Progress lines are buffered and written in batches; errors flush immediately
+log = logging.getLogger("yabook_tests")
+log.setLevel(logging.INFO)
+log_handler = logging.handlers.MemoryHandler(
+    capacity=64,
+    flushLevel=logging.ERROR,
+    target=logging.StreamHandler(sys.stdout)
+)
+log.addHandler(log_handler)
+
+class RetryTransport(httpx.HTTPTransport):
+    """Retry idempotent requests that hit a transient gateway error, backing off exponentially"""
+    
+    def __init__(self, total=3, backoff_factor=0.1, **kwargs):
+        super().__init__(**kwargs)
+        self.total = total
+        self.backoff_factor = backoff_factor
+    
+    def handle_request(self, request):
+        for attempt in range(self.total + 1):
+            response = super().handle_request(request)
+            if (
+                response.status_code not in RETRY_STATUSES
+                or request.method not in RETRY_METHODS
+                or attempt == self.total
+            ):
+                return response
+            response.close()
+            time.sleep(self.backoff_factor * (2 ** attempt))
+
+# Smallest valid PNG (1x1 grayscale) - enough for the server's magic-byte and metadata checks
+TINY_PNG = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x00\x00\x00\x00:~\x9bU"
+    b"\x00\x00\x00\nIDATx\x9cc`\x00\x00\x00\x02\x00\x01H\xaf\xa4q\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+
+# One random root per process; the counter and xdist worker id keep emails unique
+# across classes and workers without generating a fresh UUID each time
+RUN_ID = uuid.uuid4().hex
+USER_COUNTER = itertools.count()
+
+def unique_email():
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    return f"test_{RUN_ID}_{worker}_{next(USER_COUNTER)}@example.com"
+
+def json_of(response):
+    """Decode a response body with orjson instead of the stdlib json module"""
+    return orjson.loads(response.content)
+
+# Each test is self-sufficient: setUpClass gives every process its own user, and
+# _ensure_project its own project, so the class can also be sharded with
+# `pytest -n auto backend_test.py`
 class YABOOKAPITest(unittest.TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         # Get the backend URL from the frontend .env file
-        self.base_url = "https://f436a160-5c20-47d4-aacc-9fa4264abd61.preview.emergentagent.com/api"
-        self.token = None
-        self.test_user = {
-            "email": f"test_{uuid.uuid4()}@example.com",
-            "password": "Test123!",
-            "full_name": "Test User",
-            "role": "user"
-        }
-        self.project_id = None
+        cls.base_url = backend_url()
+        # One user per class: every test instance logs in as the user test_02 registers
+        cls.test_user = {**TEST_USER_DEFAULTS, "email": unique_email()}
+        # One pooled client for the whole run so keep-alive reuses the TLS connection
+        cls.client = httpx.Client(
+            base_url=cls.base_url,
+            timeout=HTTP_TIMEOUT,
+            # Retry failed connects and gateway errors so a restart or a dropped
+            # keep-alive socket doesn't fail a test
+            transport=RetryTransport(http2=True, limits=HTTP_LIMITS, retries=2)
+        )
+        cls.project_id = None
+        cls.project_response = None
+        # Register and log in once for the whole class; the first request also
+        # opens the pooled connection every later test reuses
+        try:
+            cls._authenticate()
+        except Exception:
+            cls.client.close()
+            raise
+    
+    @classmethod
+    def _authenticate(cls):
+        cls.register_response = cls.client.post(
+            REGISTER_PATH,
+            content=orjson.dumps(cls.test_user),
+            headers=JSON_HEADERS
+        )
+        cls.register_response.raise_for_status()
+        cls.login_response = cls.client.post(
+            LOGIN_PATH,
+            content=orjson.dumps({
+                "email": cls.test_user["email"],
+                "password": cls.test_user["password"]
+            }),
+            headers=JSON_HEADERS
+        )
+        cls.login_response.raise_for_status()
+        cls.token = json_of(cls.login_response)["access_token"]
+        # Every later request is authenticated, so send the token by default
+        cls.client.headers["Authorization"] = f"Bearer {cls.token}"
+    
+    @classmethod
+    def _ensure_project(cls):
+        """Create the shared test project on first use and return its id"""
+        if cls.project_id is None:
+            cls.project_response = cls.client.post(
+                PROJECTS_PATH,
+                content=orjson.dumps(PROJECT_DATA),
+                headers=JSON_HEADERS
+            )
+            cls.project_response.raise_for_status()
+            cls.project_id = json_of(cls.project_response)["id"]
+        return cls.project_id
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        log_handler.flush()
+        
+    def _assert_subset(self, response, expected):
+        """Assert a 200 response whose JSON body contains every key/value in expected"""
+        self.assertEqual(response.status_code, 200)
+        data = json_of(response)
+        self.assertLessEqual(expected.items(), data.items())
+        return data
         
     def test_01_health_check(self):
         """Test the health check endpoint"""
-        print("\n🔍 Testing health check endpoint...")
-        response = requests.get(f"{self.base_url}/health")
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["status"], "healthy")
-        print("✅ Health check passed")
+        log.info("\n🔍 Testing health check endpoint...")
+        response = self.client.get(HEALTH_PATH)
+        self._assert_subset(response, {"status": "healthy"})
+        log.info("✅ Health check passed")
         
     def test_02_register_user(self):
         """Test user registration"""
-        print("\n🔍 Testing user registration...")
-        response = requests.post(
-            f"{self.base_url}/auth/register",
-            json=self.test_user
-        )
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["email"], self.test_user["email"])
-        self.assertEqual(data["full_name"], self.test_user["full_name"])
-        print(f"✅ User registration passed for {self.test_user['email']}")
+        log.info("\n🔍 Testing user registration...")
+        self._assert_subset(self.register_response, {
+            "email": self.test_user["email"],
+            "full_name": self.test_user["full_name"]
+        })
+        log.info(f"✅ User registration passed for {self.test_user['email']}")
         
     def test_03_login_user(self):
         """Test user login"""
-        print("\n🔍 Testing user login...")
-        response = requests.post(
-            f"{self.base_url}/auth/login",
-            json={
-                "email": self.test_user["email"],
-                "password": self.test_user["password"]
-            }
-        )
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertIn("access_token", data)
-        self.token = data["access_token"]
-        print("✅ User login passed")
+        log.info("\n🔍 Testing user login...")
+        self._assert_subset(self.login_response, {"access_token": self.token})
+        self.assertTrue(self.token)
+        log.info("✅ User login passed")
         
     def test_04_get_current_user(self):
         """Test getting current user info"""
-        print("\n🔍 Testing get current user...")
-        if not self.token:
-            self.test_03_login_user()
-            
-        response = requests.get(
-            f"{self.base_url}/auth/me",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["email"], self.test_user["email"])
-        print("✅ Get current user passed")
+        log.info("\n🔍 Testing get current user...")
+        response = self.client.get(ME_PATH)
+        self._assert_subset(response, {"email": self.test_user["email"]})
+        log.info("✅ Get current user passed")
         
     def test_05_create_project(self):
         """Test project creation"""
-        print("\n🔍 Testing project creation...")
-        if not self.token:
-            self.test_03_login_user()
-            
-        project_data = {
-            "title": "Test Yearbook Project",
-            "description": "A test project for API testing",
-            "school_name": "Test School",
-            "academic_year": "2024-2025",
-            "theme_color": "#E50914"
-        }
-        
-        response = requests.post(
-            f"{self.base_url}/projects",
-            json=project_data,
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["title"], project_data["title"])
-        self.project_id = data["id"]
-        print(f"✅ Project creation passed with ID: {self.project_id}")
+        log.info("\n🔍 Testing project creation...")
+        self._ensure_project()
+        self._assert_subset(self.project_response, PROJECT_DATA)
+        log.info(f"✅ Project creation passed with ID: {self.project_id}")
         
     def test_06_get_projects(self):
         """Test getting user projects"""
-        print("\n🔍 Testing get user projects...")
-        if not self.token:
-            self.test_03_login_user()
-        if not self.project_id:
-            self.test_05_create_project()
-            
-        response = requests.get(
-            f"{self.base_url}/projects",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
+        log.info("\n🔍 Testing get user projects...")
+        self._ensure_project()
+        
+        response = self.client.get(PROJECTS_PATH)
         self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertIsInstance(data, list)
-        self.assertGreaterEqual(len(data), 1)
-        print(f"✅ Get projects passed, found {len(data)} projects")
+        data = json_of(response)
+        self.assertIsInstance(data["items"], list)
+        self.assertGreaterEqual(len(data["items"]), 1)
+        
+        # A cursor without the "|id" half cannot seek reliably and is rejected
+        response = self.client.get(PROJECTS_PATH, params={"cursor": data["items"][0]["created_at"]})
+        self.assertEqual(response.status_code, 400)
+        log.info(f"✅ Get projects passed, found {len(data['items'])} projects")
         
     def test_07_get_project_by_id(self):
         """Test getting a specific project by ID"""
-        print("\n🔍 Testing get project by ID...")
-        if not self.token:
-            self.test_03_login_user()
-        if not self.project_id:
-            self.test_05_create_project()
-            
-        response = requests.get(
-            f"{self.base_url}/projects/{self.project_id}",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["id"], self.project_id)
-        print(f"✅ Get project by ID passed for project: {data['title']}")
+        log.info("\n🔍 Testing get project by ID...")
+        self._ensure_project()
+        
+        response = self.client.get(PROJECT_PATH.format(pid=self.project_id))
+        data = self._assert_subset(response, {"id": self.project_id})
+        log.info(f"✅ Get project by ID passed for project: {data['title']}")
         
     def test_08_update_project(self):
         """Test updating a project"""
-        print("\n🔍 Testing update project...")
-        if not self.token:
-            self.test_03_login_user()
-        if not self.project_id:
-            self.test_05_create_project()
-            
+        log.info("\n🔍 Testing update project...")
+        self._ensure_project()
+        
         update_data = {
             "title": "Updated Test Project",
             "description": "This project has been updated",
@@ -146,69 +261,124 @@ class YABOOKAPITest(unittest.TestCase):
             "theme_color": "#1E40AF"
         }
         
-        response = requests.put(
-            f"{self.base_url}/projects/{self.project_id}",
-            json=update_data,
-            headers={"Authorization": f"Bearer {self.token}"}
+        response = self.client.put(
+            PROJECT_PATH.format(pid=self.project_id),
+            content=orjson.dumps(update_data),
+            headers=JSON_HEADERS
         )
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertEqual(data["title"], update_data["title"])
-        print("✅ Update project passed")
+        self._assert_subset(response, update_data)
+        log.info("✅ Update project passed")
         
+    @unittest.skipUnless(os.environ.get("YABOOK_RUN_UPLOAD"), "photo upload fixture not configured")
     def test_09_upload_photo(self):
-        """Test photo upload (mock test)"""
-        print("\n🔍 Testing photo upload...")
-        if not self.token:
-            self.test_03_login_user()
-        if not self.project_id:
-            self.test_05_create_project()
-            
-        # Note: This is a mock test since we can't easily create a file in this environment
-        print("⚠️ Photo upload test skipped - requires file upload capability")
-        print("✅ Photo upload endpoint exists in API")
+        """Test photo upload"""
+        log.info("\n🔍 Testing photo upload...")
+        self._ensure_project()
+        
+        response = self.client.post(
+            PHOTOS_PATH.format(pid=self.project_id),
+            files={"file": ("test.png", BytesIO(TINY_PNG), "image/png")}
+        )
+        data = self._assert_subset(response, {
+            "project_id": self.project_id,
+            "original_name": "test.png",
+            "mime_type": "image/png"
+        })
+        log.info(f"✅ Photo upload passed with ID: {data['id']}")
+        
+    @unittest.skipUnless(os.environ.get("YABOOK_RUN_UPLOAD"), "photo upload fixture not configured")
+    def test_09b_batch_upload_photos(self):
+        """Test batch photo upload and its all-or-nothing rollback"""
+        log.info("\n🔍 Testing batch photo upload...")
+        self._ensure_project()
+        batch_path = PHOTO_BATCH_PATH.format(pid=self.project_id)
+        stats_path = PHOTO_STATS_PATH.format(pid=self.project_id)
+        
+        response = self.client.post(batch_path, files=[
+            ("files", ("batch_1.png", BytesIO(TINY_PNG), "image/png")),
+            ("files", ("batch_2.png", BytesIO(TINY_PNG), "image/png"))
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = json_of(response)
+        self.assertEqual([photo["original_name"] for photo in data], ["batch_1.png", "batch_2.png"])
+        
+        # One non-image file rejects the whole batch, including the valid PNG beside it
+        total_before = self._assert_subset(self.client.get(stats_path), {})["total_photos"]
+        response = self.client.post(batch_path, files=[
+            ("files", ("batch_3.png", BytesIO(TINY_PNG), "image/png")),
+            ("files", ("notes.txt", BytesIO(b"not an image"), "text/plain"))
+        ])
+        self.assertEqual(response.status_code, 400)
+        self._assert_subset(self.client.get(stats_path), {"total_photos": total_before})
+        log.info(f"✅ Batch photo upload passed, stored {len(data)} photos and rolled back the rejected batch")
         
     def test_10_get_project_photos(self):
         """Test getting project photos"""
-        print("\n🔍 Testing get project photos...")
-        if not self.token:
-            self.test_03_login_user()
-        if not self.project_id:
-            self.test_05_create_project()
+        log.info("\n🔍 Testing get project photos...")
+        self._ensure_project()
+        
+        response = self.client.get(PHOTOS_PATH.format(pid=self.project_id))
+        data = self._assert_subset(response, {"page": 1})
+        self.assertIsInstance(data["photos"], list)
+        
+        # Relevance pages must not overlap, which needs a tiebreaker on equal scores
+        relevance_pages = [
+            self._assert_subset(
+                self.client.get(
+                    PHOTOS_PATH.format(pid=self.project_id),
+                    params={"search": "test", "sort_by": "relevance", "per_page": 1, "page": page}
+                ),
+                {"page": page}
+            )
+            for page in (1, 2)
+        ]
+        relevance_ids = [photo["id"] for result in relevance_pages for photo in result["photos"]]
+        self.assertEqual(len(relevance_ids), len(set(relevance_ids)))
+        log.info(f"✅ Get project photos passed, found {data['total']} photos")
+        
+    def test_11_concurrent_read_probes(self):
+        """Test the read-only endpoints concurrently"""
+        log.info("\n🔍 Testing read-only endpoints concurrently...")
+        self._ensure_project()
+        
+        # These share no state, so overlap their round-trips instead of paying them one by one
+        photos_path = PHOTOS_PATH.format(pid=self.project_id)
+        paths = [
+            HEALTH_PATH,
+            ME_PATH,
+            PROJECTS_PATH,
+            PROJECT_PATH.format(pid=self.project_id),
+            photos_path,
+            PHOTO_STATS_PATH.format(pid=self.project_id),
+            f"{photos_path}?search=test",
+            f"{photos_path}?search=nonexistentquerythatshouldmatchnothing12345"
+        ]
+        results = asyncio.run(self._get_concurrently(paths))
+        # Collect every probe's outcome first so one run reports all broken endpoints
+        failures = {
+            path: repr(result) if isinstance(result, Exception) else result.status_code
+            for path, result in zip(paths, results)
+            if isinstance(result, Exception) or result.status_code != 200
+        }
+        self.assertEqual(failures, {}, "read probes that did not return 200")
+        log.info(f"✅ Concurrent read probes passed for {len(paths)} endpoints")
+        
+    async def _get_concurrently(self, paths):
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=True,
+            timeout=HTTP_TIMEOUT,
+            limits=HTTP_LIMITS,
+            headers=self.client.headers
+        ) as client:
+            # Cap in-flight requests so a long probe list can't flood the server
+            semaphore = asyncio.Semaphore(PROBE_CONCURRENCY)
             
-        response = requests.get(
-            f"{self.base_url}/projects/{self.project_id}/photos",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
-        self.assertEqual(response.status_code, 200)
-        data = response.json()
-        self.assertIsInstance(data, list)
-        print(f"✅ Get project photos passed, found {len(data)} photos")
-
-def run_tests():
-    # Create a test instance
-    test_instance = YABOOKAPITest()
-    test_instance.setUp()  # Initialize the test instance
-    
-    # Run tests manually in sequence
-    try:
-        test_instance.test_01_health_check()
-        test_instance.test_02_register_user()
-        test_instance.test_03_login_user()
-        test_instance.test_04_get_current_user()
-        test_instance.test_05_create_project()
-        test_instance.test_06_get_projects()
-        test_instance.test_07_get_project_by_id()
-        test_instance.test_08_update_project()
-        test_instance.test_09_upload_photo()
-        test_instance.test_10_get_project_photos()
-        print("\n✅ All API tests passed successfully!")
-    except AssertionError as e:
-        print(f"\n❌ Test failed: {str(e)}")
-    except Exception as e:
-        print(f"\n❌ Error during test: {str(e)}")
+            async def get(path):
+                async with semaphore:
+                    return await client.get(path)
+            
+            return await asyncio.gather(*(get(path) for path in paths), return_exceptions=True)
 
 if __name__ == "__main__":
-    print("🚀 Starting YABOOK API Tests")
-    run_tests()
-    print("✅ API Tests completed")
\ No newline at end of file
+    unittest.main()
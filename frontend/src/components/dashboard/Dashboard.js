@@ -10,6 +10,7 @@ import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const PROJECTS_PAGE_SIZE = 200;
 
 const Dashboard = () => {
   const [projects, setProjects] = useState([]);
@@ -25,10 +26,18 @@ const Dashboard = () => {
   const fetchProjects = async () => {
     try {
       const token = localStorage.getItem('token');
-      const response = await axios.get(`${API}/projects`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setProjects(response.data);
+      // The list is cursor-paginated; follow next_cursor so the stats cover every project
+      const allProjects = [];
+      let cursor = null;
+      do {
+        const response = await axios.get(`${API}/projects`, {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { limit: PROJECTS_PAGE_SIZE, ...(cursor && { cursor }) }
+        });
+        allProjects.push(...response.data.items);
+        cursor = response.data.next_cursor;
+      } while (cursor);
+      setProjects(allProjects);
     } catch (error) {
       addToast('Failed to fetch projects', 'error');
     } finally {